@@ -15,14 +15,15 @@ Updated: 2025-07-06 - Added /debate endpoint for frontend compatibility
 
 import os
 import asyncio
-import json
 import logging
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+import orjson
 
 # LiveKit imports for token generation
 from livekit import api
@@ -34,7 +35,16 @@ from livekit import api
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Sage AI Backend", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close the shared LiveKit API client's HTTP session on shutdown"""
+    yield
+    global _livekit_api
+    if _livekit_api is not None:
+        await _livekit_api.aclose()
+        _livekit_api = None
+
+app = FastAPI(title="Sage AI Backend", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware for frontend integration - Updated for Lovable domains
 app.add_middleware(
@@ -100,6 +110,16 @@ if not all([LIVEKIT_URL, LIVEKIT_API_KEY, LIVEKIT_API_SECRET]):
 # Global state for active agents
 active_agents: Dict[str, Dict[str, Any]] = {}
 
+# Shared LiveKit API client - one pooled HTTP session for all dispatches instead of one per request
+_livekit_api: Optional[api.LiveKitAPI] = None
+
+def get_livekit_api() -> api.LiveKitAPI:
+    """Return the shared LiveKit API client, creating it on first use inside the running loop"""
+    global _livekit_api
+    if _livekit_api is None:
+        _livekit_api = api.LiveKitAPI()
+    return _livekit_api
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -131,7 +151,7 @@ async def create_debate(request: DebateRequest):
         # ✅ FIXED: Use room_name from frontend request instead of generating our own
         room_name = request.room_name
         
-        logger.info(f"Created debate room {room_name} for topic: {request.topic}")
+        logger.info("Created debate room %s for topic: %s", room_name, request.topic)
         
         return {
             "room_name": room_name,
@@ -142,7 +162,7 @@ async def create_debate(request: DebateRequest):
         }
         
     except Exception as e:
-        logger.error(f"Failed to create debate: {e}")
+        logger.error("Failed to create debate: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/participant-token")
@@ -150,11 +170,11 @@ async def generate_participant_token(request: TokenRequest):
     """Generate LiveKit token for participant with topic context"""
     try:
         # 🔍 DEBUG: Log what parameters we received from frontend
-        logger.info(f"🔍 /participant-token received parameters:")
-        logger.info(f"   - room_name: '{request.room_name}'")
-        logger.info(f"   - participant_name: '{request.participant_name}'")
-        logger.info(f"   - topic: '{request.topic}'")
-        logger.info(f"   - persona: '{request.persona}'")
+        logger.info("🔍 /participant-token received parameters:")
+        logger.info("   - room_name: '%s'", request.room_name)
+        logger.info("   - participant_name: '%s'", request.participant_name)
+        logger.info("   - topic: '%s'", request.topic)
+        logger.info("   - persona: '%s'", request.persona)
         
         # Create token with participant permissions
         # Ensure all required parameters are present
@@ -179,7 +199,7 @@ async def generate_participant_token(request: TokenRequest):
         if not token:
             raise ValueError("Failed to generate JWT token")
         
-        logger.info(f"✅ Generated token for {request.participant_name} in room {request.room_name}")
+        logger.info("✅ Generated token for %s in room %s", request.participant_name, request.room_name)
         
         return {
             "token": token,
@@ -190,7 +210,7 @@ async def generate_participant_token(request: TokenRequest):
         }
         
     except Exception as e:
-        logger.error(f"Failed to generate token: {e}")
+        logger.error("Failed to generate token: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/launch-ai-agents")
@@ -215,7 +235,7 @@ async def launch_ai_agents(request: AgentLaunchRequest, background_tasks: Backgr
         # Launch agent process in background
         background_tasks.add_task(start_agent_process, request.room_name, request.topic, request.persona)
         
-        logger.info(f"Launching AI agents for room {request.room_name} with topic: {request.topic}, persona: {request.persona}")
+        logger.info("Launching AI agents for room %s with topic: %s, persona: %s", request.room_name, request.topic, request.persona)
         
         return {
             "message": "AI agents launching",
@@ -225,7 +245,7 @@ async def launch_ai_agents(request: AgentLaunchRequest, background_tasks: Backgr
         }
         
     except Exception as e:
-        logger.error(f"Failed to launch AI agents: {e}")
+        logger.error("Failed to launch AI agents: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/ai-agents/stop")
@@ -234,13 +254,13 @@ async def stop_ai_agents(request: AgentStopRequest):
     try:
         if request.room_name in active_agents:
             del active_agents[request.room_name]
-            logger.info(f"Stopped AI agents for room {request.room_name}")
+            logger.info("Stopped AI agents for room %s", request.room_name)
             return {"message": "AI agents stopped", "room_name": request.room_name}
         else:
             return {"message": "No active agents found for this room", "room_name": request.room_name}
             
     except Exception as e:
-        logger.error(f"Failed to stop AI agents: {e}")
+        logger.error("Failed to stop AI agents: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/ai-agents/status/{room_name}")
@@ -264,74 +284,70 @@ async def get_all_agent_status():
 async def start_agent_process(room_name: str, topic: str, persona: str):
     """Use official LiveKit agent dispatch with job metadata"""
     try:
-        logger.info(f"🚀 Dispatching agent using official LiveKit agent dispatch for room {room_name}")
+        logger.info("🚀 Dispatching agent using official LiveKit agent dispatch for room %s", room_name)
         
         # Add small delay to ensure background worker is fully registered (LiveKit best practice)
         import asyncio
         await asyncio.sleep(2)  # 2-second delay to ensure worker registration
-        logger.info(f"⏰ Delay complete, proceeding with agent dispatch...")
+        logger.info("⏰ Delay complete, proceeding with agent dispatch...")
         
         # Use official LiveKit agent dispatch API as documented
-        lkapi = api.LiveKitAPI()
-        try:
-            # Create job metadata with topic and persona (JSON string as per docs)
-            job_metadata = json.dumps({
-                "topic": topic,
-                "persona": persona,
-                "room_name": room_name,
-                "agent_type": "debate_moderator",
-                "created_at": datetime.now().isoformat()
-            })
-            
-            logger.info(f"🎯 Creating agent dispatch with job metadata: {job_metadata}")
-            
-            # Use official agent dispatch API as documented
-            dispatch = await lkapi.agent_dispatch.create_dispatch(
-                api.CreateAgentDispatchRequest(
-                    agent_name="sage-debate-moderator",  # Must match agent registration name
-                    room=room_name,
-                    metadata=job_metadata  # Job metadata passed as JSON string
-                )
+        lkapi = get_livekit_api()
+        # Create job metadata with topic and persona (JSON string as per docs)
+        job_metadata = orjson.dumps({
+            "topic": topic,
+            "persona": persona,
+            "room_name": room_name,
+            "agent_type": "debate_moderator",
+            "created_at": datetime.now().isoformat()
+        }).decode()
+        
+        logger.info("🎯 Creating agent dispatch with job metadata: %s", job_metadata)
+        
+        # Use official agent dispatch API as documented
+        dispatch = await lkapi.agent_dispatch.create_dispatch(
+            api.CreateAgentDispatchRequest(
+                agent_name="sage-debate-moderator",  # Must match agent registration name
+                room=room_name,
+                metadata=job_metadata  # Job metadata passed as JSON string
             )
+        )
+        
+        logger.info("✅ Agent dispatched successfully:")
+        logger.info("   Dispatch object: %s", dispatch)
+        logger.info("   Dispatch type: %s", type(dispatch))
+        
+        # Check if dispatch has expected attributes
+        if hasattr(dispatch, 'dispatch_id'):
+            logger.info("   Dispatch ID: %s", dispatch.dispatch_id)
+        elif hasattr(dispatch, 'id'):
+            logger.info("   Dispatch ID: %s", dispatch.id)
+        else:
+            logger.warning("   No dispatch_id or id attribute found")
             
-            logger.info(f"✅ Agent dispatched successfully:")
-            logger.info(f"   Dispatch object: {dispatch}")
-            logger.info(f"   Dispatch type: {type(dispatch)}")
+        if hasattr(dispatch, 'agent_name'):
+            logger.info("   Agent Name: %s", dispatch.agent_name)
+        else:
+            logger.warning("   No agent_name attribute found")
             
-            # Check if dispatch has expected attributes
+        if hasattr(dispatch, 'room'):
+            logger.info("   Room: %s", dispatch.room)
+        else:
+            logger.warning("   No room attribute found")
+        
+        # Update status with dispatch information
+        if room_name in active_agents:
+            active_agents[room_name]["status"] = "dispatched"
             if hasattr(dispatch, 'dispatch_id'):
-                logger.info(f"   Dispatch ID: {dispatch.dispatch_id}")
+                active_agents[room_name]["dispatch_id"] = dispatch.dispatch_id
             elif hasattr(dispatch, 'id'):
-                logger.info(f"   Dispatch ID: {dispatch.id}")
-            else:
-                logger.warning(f"   No dispatch_id or id attribute found")
-                
+                active_agents[room_name]["dispatch_id"] = dispatch.id
             if hasattr(dispatch, 'agent_name'):
-                logger.info(f"   Agent Name: {dispatch.agent_name}")
-            else:
-                logger.warning(f"   No agent_name attribute found")
-                
-            if hasattr(dispatch, 'room'):
-                logger.info(f"   Room: {dispatch.room}")
-            else:
-                logger.warning(f"   No room attribute found")
-            
-            # Update status with dispatch information
-            if room_name in active_agents:
-                active_agents[room_name]["status"] = "dispatched"
-                if hasattr(dispatch, 'dispatch_id'):
-                    active_agents[room_name]["dispatch_id"] = dispatch.dispatch_id
-                elif hasattr(dispatch, 'id'):
-                    active_agents[room_name]["dispatch_id"] = dispatch.id
-                if hasattr(dispatch, 'agent_name'):
-                    active_agents[room_name]["agent_name"] = dispatch.agent_name
-                active_agents[room_name]["job_metadata"] = job_metadata
-            
-        finally:
-            await lkapi.aclose()
+                active_agents[room_name]["agent_name"] = dispatch.agent_name
+            active_agents[room_name]["job_metadata"] = job_metadata
         
     except Exception as e:
-        logger.error(f"❌ Failed to dispatch agent: {e}")
+        logger.error("❌ Failed to dispatch agent: %s", e)
         if room_name in active_agents:
             active_agents[room_name]["status"] = "failed"
             active_agents[room_name]["error"] = str(e)
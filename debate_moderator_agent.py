@@ -6,15 +6,23 @@ Follows exact patterns from https://docs.livekit.io/agents/quickstarts/voice-age
 """
 
 import os
-import json
+import re
+import sys
+import asyncio
 import logging
+import functools
+from datetime import datetime
+
 import httpx
+import orjson
+from cachetools import TTLCache
 
 # Core LiveKit imports following official patterns
 from livekit.agents import (
     Agent,
     AgentSession, 
     JobContext,
+    JobProcess,
     JobRequest,
     RunContext,
     WorkerOptions,
@@ -23,86 +31,260 @@ from livekit.agents import (
 )
 from livekit.plugins import deepgram, openai, silero, cartesia
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured in __main__ so importing this module doesn't lock in root handlers
 logger = logging.getLogger(__name__)
 
 # Brave Search API configuration - API key managed by Render
-BRAVE_API_URL = "https://api.search.brave.com/res/v1/web/search"
+BRAVE_API_BASE_URL = "https://api.search.brave.com"
+BRAVE_SEARCH_PATH = "/res/v1/web/search"
+BRAVE_DEADLINE_SECONDS = 3.5  # Participants are waiting in silence - fail fast rather than verify late
 BRAVE_API_KEY = os.environ.get("BRAVE_API_KEY")  # Render will inject this
 if not BRAVE_API_KEY:
     logger.warning("⚠️ BRAVE_API_KEY not found - Brave Search functionality will be disabled")
     BRAVE_API_KEY = None
 
-# Initialize memory manager (if available)
+# Ask for brotli when httpx can decode it (needs the brotli package), gzip otherwise
 try:
-    from supabase_memory_manager import SupabaseMemoryManager
-    memory_manager = SupabaseMemoryManager()
-    logger.info("✅ Supabase memory manager initialized successfully")
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = "br, gzip"
 except ImportError:
-    logger.warning("⚠️ Supabase memory manager not available - continuing without memory features")
-    memory_manager = None
-except Exception as e:
-    logger.warning(f"⚠️ Memory manager initialization failed: {e}")
-    memory_manager = None
+    _ACCEPT_ENCODING = "gzip"
 
-# Global state tracking
-current_persona = None
-current_topic = None
+# Shared Brave client - reuses TCP/TLS connections across fact-checks instead of a handshake per call
+_BRAVE_CLIENT: httpx.AsyncClient | None = None
 
-def get_persona_instructions(persona: str, topic: str) -> str:
-    """Generate persona-specific instructions based on the selected moderator"""
-    
-    from datetime import datetime
-    current_date = datetime.now().strftime("%B %d, %Y")
-    
-    base_instructions = f"""You are {persona}, a wise debate moderator for voice conversations.
+def _get_brave_client() -> httpx.AsyncClient:
+    """Return the process-wide Brave Search client, creating it on first use"""
+    global _BRAVE_CLIENT
+    if _BRAVE_CLIENT is None or _BRAVE_CLIENT.is_closed:
+        # Headers following Brave Search API best practices from Context7 documentation
+        _BRAVE_CLIENT = httpx.AsyncClient(
+            base_url=BRAVE_API_BASE_URL,
+            headers={
+                "Accept": "application/json",
+                "Accept-Encoding": _ACCEPT_ENCODING,
+                "X-Subscription-Token": BRAVE_API_KEY,
+            },
+            http2=True,
+            # Tight per-phase limits - waiting on the pool or a socket must not eat the whole deadline
+            timeout=httpx.Timeout(connect=1.0, read=3.0, write=1.0, pool=0.5),
+            limits=httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=30),
+        )
+    return _BRAVE_CLIENT
 
-CURRENT CONTEXT: Today is {current_date}. You have access to real-time information through tools.
+async def _close_brave_client():
+    """Close the shared Brave client - registered as a job shutdown callback"""
+    global _BRAVE_CLIENT
+    if _BRAVE_CLIENT is not None:
+        await _BRAVE_CLIENT.aclose()
+        _BRAVE_CLIENT = None
 
-Core principles:
-- Keep responses SHORT (1-2 sentences max)
-- Let participants lead - only intervene when needed
-- Allow natural pauses in conversation
+# Conversational filler the LLM sometimes sends to brave_search - never worth a network call
+_FILLER = frozenset({"ok", "thanks", "hello", "hi", "yes", "no"})
+# Brave truncates long queries anyway, so anything past this is a transcript rather than a claim
+_MAX_QUERY_TOKENS = 40
+# Opinion phrases stripped from queries before searching - one case-insensitive pass
+_OPINION_RE = re.compile(r"\b(?:I think|I believe|In my opinion)\b", re.IGNORECASE)
+# Recent Brave answers keyed by search query - debates repeat the same claims over and over.
+# Misses ("no sources") get a shorter TTL so new terms are retried soon.
+_SEARCH_CACHE: TTLCache = TTLCache(maxsize=512, ttl=900)
+_NO_RESULTS_CACHE: TTLCache = TTLCache(maxsize=256, ttl=120)
+# Statements of feeling rather than fact ("I feel that...", "hope we...") - nothing to verify
+_OPINION_MARKER_RE = re.compile(r"(?:i\s+)?(?:feel|wish|hope|prefer)\b")
+# Brave requests currently on the wire, keyed by search query (single-flight)
+_INFLIGHT: dict[str, asyncio.Task] = {}
+# Weather keyword classes for query rewriting - one C-level scan each instead of a Python loop of `in` checks
+_NYC_RE = re.compile("|".join(map(re.escape, ("new york", "nyc"))))
+_TEMPERATURE_TERMS_RE = re.compile("|".join(map(re.escape, ("temperature", "temp", "degrees"))))
+# Temperature mentions in result descriptions ("72°F", "18 C")
+_TEMPERATURE_RE = re.compile(r'\b\d+\s*°?[FfCc]?\b')
 
-IMPORTANT: When participants ask questions requiring real-time information, USE YOUR TOOLS:
-- For any current events, facts, or real-time data - use brave_search immediately
-- Share the information you find through your tools
-- Don't refuse factual questions - that's what your tools are for!
+# Memory manager (if available) - loaded per worker process, not at import, since
+# connecting to Supabase blocks on a test query that the CLI supervisor and download-files never need
+memory_manager = None
+_memory_loaded = False
 
-Available tools:
-- moderate_discussion: Provide philosophical guidance and redirect conversations
-- brave_search: Search for real-time information and fact-check statements  
-- set_debate_topic: Change the discussion topic when requested"""
+def _load_memory_manager():
+    """Import the shared Supabase memory manager instance - blocking, so call from prewarm or a thread"""
+    global memory_manager, _memory_loaded
+    try:
+        # Reuse the module's global instance rather than opening a second Supabase client
+        from supabase_memory_manager import memory_manager as shared_memory_manager
+        memory_manager = shared_memory_manager
+        logger.info("✅ Supabase memory manager initialized successfully")
+    except ImportError:
+        logger.warning("⚠️ Supabase memory manager not available - continuing without memory features")
+    except Exception as e:
+        logger.warning("⚠️ Memory manager initialization failed: %s", e)
+    _memory_loaded = True
+
+# Memory writes from tools are queued and flushed in batches by a background writer,
+# so tool replies never wait on a Supabase round-trip
+_MEM_BATCH_SIZE = 50
+_MEM_FLUSH_INTERVAL = 1.0  # seconds
+_MEM_DRAIN_TIMEOUT = 5.0  # seconds allowed to flush pending writes at shutdown
+_MEM_QUEUE: asyncio.Queue = asyncio.Queue(maxsize=1000)
+_MEM_WRITER: asyncio.Task | None = None
+
+def _queue_memory_write(item: dict):
+    """Queue a memory event for the background writer, dropping the oldest one if the queue is full"""
+    if not memory_manager:
+        return
+    try:
+        _MEM_QUEUE.put_nowait(item)
+    except asyncio.QueueFull:
+        # Fire-and-forget audit trail - losing the oldest event beats blocking the conversation
+        dropped = _MEM_QUEUE.get_nowait()
+        _MEM_QUEUE.task_done()
+        logger.warning("⚠️ Memory queue full - dropped oldest %s event", dropped.get("type"))
+        _MEM_QUEUE.put_nowait(item)
+
+async def _memory_writer():
+    """Flush queued memory events in batches of up to _MEM_BATCH_SIZE or every _MEM_FLUSH_INTERVAL"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _MEM_QUEUE.get()]
+        deadline = loop.time() + _MEM_FLUSH_INTERVAL
+        while len(batch) < _MEM_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                async with asyncio.timeout(remaining):
+                    batch.append(await _MEM_QUEUE.get())
+            except TimeoutError:
+                break
+        try:
+            await memory_manager.store_batch(batch)
+        except Exception as e:
+            logger.warning("Failed to store memory batch: %s", e)
+        finally:
+            for _ in batch:
+                _MEM_QUEUE.task_done()
+
+def _start_memory_writer():
+    """Start the background memory writer if memory is enabled and it isn't already running"""
+    global _MEM_WRITER
+    if memory_manager and (_MEM_WRITER is None or _MEM_WRITER.done()):
+        _MEM_WRITER = asyncio.create_task(_memory_writer())
+
+async def _drain_memory_writer():
+    """Flush pending memory events and stop the writer - registered as a job shutdown callback"""
+    global _MEM_WRITER
+    if _MEM_WRITER is None:
+        return
+    try:
+        async with asyncio.timeout(_MEM_DRAIN_TIMEOUT):
+            await _MEM_QUEUE.join()
+    except TimeoutError:
+        logger.warning("⚠️ Timed out flushing %s pending memory events", _MEM_QUEUE.qsize())
+    _MEM_WRITER.cancel()
+    _MEM_WRITER = None
+
+# Shared voice pipeline plugins - loaded once per worker process into proc.userdata and reused across sessions
+_plugins_lock = asyncio.Lock()
+
+def prewarm(proc: JobProcess):
+    """Load the VAD model and connect the memory manager once per worker process, before any job is assigned to it"""
+    proc.userdata["vad"] = silero.VAD.load()
+    _load_memory_manager()
 
-    persona_specific = {
-        "Socrates": """
+async def _get_plugins(proc: JobProcess):
+    """Lazily initialize the VAD/STT/LLM/TTS plugins on first use and return the cached instances"""
+    userdata = proc.userdata
+    async with _plugins_lock:
+        if "vad" not in userdata:
+            # Normally done by prewarm; otherwise load the ONNX model off the event loop
+            userdata["vad"] = await asyncio.to_thread(silero.VAD.load)
+        if "stt" not in userdata:
+            # Built on the job loop rather than in prewarm so their HTTP clients bind to the loop that uses them
+            userdata["stt"] = deepgram.STT(model="nova-3")
+            userdata["llm"] = openai.LLM(model="gpt-4o-mini")
+            # Voice and speed are the same for every persona, so TTS can be shared too
+            userdata["tts"] = cartesia.TTS(
+                model="sonic-2-2025-03-07",  # Updated model that supports speed controls
+                voice="a0e99841-438c-4a64-b679-ae501e7d6091",  # British Male (professional, deeper voice)
+                speed=0.8, # Added speed parameter
+            )
+            logger.info("🔌 Voice pipeline plugins initialized (VAD/STT/LLM/TTS)")
+    return userdata["vad"], userdata["stt"], userdata["llm"], userdata["tts"]
+
+# Supported moderator personas - keys are interned so lookups hit the identity fast path
+_DEFAULT_PERSONA = "Socrates"
+_PERSONA_SPECIFIC: dict[str, str] = {sys.intern(name): text for name, text in {
+    "Socrates": """
 Socratic approach:
 - Ask ONE thoughtful question, then let them think
 - Sometimes just acknowledge: "That's worth reflecting on"
 - Practice intellectual humility: "I'm not sure about that either"
 - Don't question every response - balance with supportive comments""",
 
-        "Aristotle": """
+    "Aristotle": """
 Aristotelian approach:
 - Guide toward balanced, logical positions
 - Point out logical fallacies briefly
 - Encourage evidence-based reasoning
 - Help find middle ground between extremes""",
 
-        "Buddha": """
+    "Buddha": """
 Buddhist approach:
 - Focus on compassion and understanding
 - Help find common ground between opposing views
 - Encourage mindful listening
 - Gently redirect away from personal attacks"""
-    }
+}.items()}
+_PERSONAS = frozenset(_PERSONA_SPECIFIC)
+
+def _normalize_persona(persona) -> str:
+    """Return the interned persona name, falling back to Socrates for unknown values"""
+    persona = sys.intern(persona) if isinstance(persona, str) else _DEFAULT_PERSONA
+    return persona if persona in _PERSONAS else _DEFAULT_PERSONA
+
+# Shared instruction scaffold - {persona} and {current_date} are filled in per agent
+_BASE_INSTRUCTIONS = """You are {persona}, a wise debate moderator for voice conversations.
+
+CURRENT CONTEXT: Today is {current_date}. You have access to real-time information through tools.
+
+Core principles:
+- Keep responses SHORT (1-2 sentences max)
+- Let participants lead - only intervene when needed
+- Allow natural pauses in conversation
+
+IMPORTANT: When participants ask questions requiring real-time information, USE YOUR TOOLS:
+- For any current events, facts, or real-time data - use brave_search immediately
+- Share the information you find through your tools
+- Don't refuse factual questions - that's what your tools are for!
+
+Available tools:
+- moderate_discussion: Provide philosophical guidance and redirect conversations
+- brave_search: Search for real-time information and fact-check statements  
+- set_debate_topic: Change the discussion topic when requested"""
+
+# Full instruction templates per persona, concatenated once at import
+_DEFAULT_TEMPLATE = _BASE_INSTRUCTIONS + "\n"
+_PERSONA_TEMPLATES: dict[str, str] = {
+    name: _DEFAULT_TEMPLATE + text for name, text in _PERSONA_SPECIFIC.items()
+}
 
-    return base_instructions + "\n" + persona_specific.get(persona, "")
+@functools.lru_cache(maxsize=64)
+def _render_instructions(persona: str, current_date: str) -> str:
+    """Fill a persona template - cached since every room with the same persona on the same day gets identical text"""
+    return _PERSONA_TEMPLATES.get(persona, _DEFAULT_TEMPLATE).format(persona=persona, current_date=current_date)
+
+# Opening line spoken verbatim at session start - fixed text, so it goes straight to TTS
+_GREETING_TEMPLATE = "Hello, I'm {persona}. Today we'll be discussing {topic}. Go ahead with your opening arguments, and call upon me as needed."
+
+def get_persona_instructions(persona: str, topic: str) -> str:
+    """Generate persona-specific instructions based on the selected moderator"""
+    # The date is part of the cache key so long-running workers roll over at midnight
+    return _render_instructions(persona, datetime.now().strftime("%B %d, %Y"))
 
 # === Agent Class Definition ===
 class DebateModerator(Agent):
-    """Sage AI Debate Moderator Agent with persona-based behavior"""
+    """Sage AI Debate Moderator Agent with persona-based behavior
+    
+    Holds the session's persona and topic; tools reach it via ctx.session.current_agent.
+    """
     
     def __init__(self, persona: str, topic: str):
         self.persona = persona
@@ -113,12 +295,15 @@ class DebateModerator(Agent):
         
         super().__init__(
             instructions=instructions,
-            tools=[moderate_discussion, brave_search, set_debate_topic],
+            tools=list(_TOOLS),  # Agent calls .copy() on this, so it must be a list
         )
         
-        logger.info(f"🎭 Created {persona} agent for topic: {topic}")
+        logger.info("🎭 Created %s agent for topic: %s", persona, topic)
 
 # === Core Agent Functions ===
+# Intervention types moderate_discussion accepts (mirrors its docstring for the LLM)
+_INTERVENTION_TYPES = frozenset({"clarify", "redirect", "summarize", "question"})
+
 @function_tool()
 async def moderate_discussion(ctx: RunContext, intervention_type: str, guidance: str) -> str:
     """
@@ -128,20 +313,75 @@ async def moderate_discussion(ctx: RunContext, intervention_type: str, guidance:
         intervention_type: Type of moderation needed (clarify, redirect, summarize, question)
         guidance: The specific guidance or question to offer
     """
-    logger.info(f"🎭 {current_persona} moderating: {intervention_type}")
+    # Reject hallucinated intervention types before they cost a memory write
+    if intervention_type not in _INTERVENTION_TYPES:
+        logger.warning("⚠️ Unknown intervention type: %s", intervention_type)
+        return f"Unknown intervention '{intervention_type}'. Use one of: clarify, redirect, summarize, question."
     
-    # Store moderation action in memory if available
-    if memory_manager:
-        try:
-            await memory_manager.store_moderation_action(
-                action=intervention_type,
-                content=guidance,
-                persona=current_persona
-            )
-        except Exception as e:
-            logger.warning(f"Failed to store moderation in memory: {e}")
+    persona = ctx.session.current_agent.persona
+    logger.info("🎭 %s moderating: %s", persona, intervention_type)
+    
+    # Store moderation action in memory if available (queued - never blocks the reply)
+    _queue_memory_write({
+        "type": "moderation",
+        "action": intervention_type,
+        "content": guidance,
+        "persona": persona,
+    })
+    
+    return f"As {persona}, I offer this guidance: {guidance}"
+
+def _format_result(result: dict, is_weather: bool) -> str:
+    """Format a single Brave result as one voice-friendly line"""
+    title = result.get("title", "No title")
+    description = result.get("description", "")
+    logger.debug("🔍 DEBUG Result: %s | %s | %s...", title, result.get('url', ''), description[:100])
+    
+    # For weather queries, include temperature from description if available
+    temp_info = ""
+    if is_weather and description:
+        # Extract temperature info from description
+        if "°" in description or "degrees" in description.lower():
+            # Find temperature mentions
+            temp_matches = _TEMPERATURE_RE.findall(description)
+            if temp_matches:
+                temp_info = f" - {temp_matches[0]}"
+    
+    # Truncate title if too long for voice
+    if len(title) > 60:
+        title = title[:57] + "..."
+    
+    return f"• {title}{temp_info}"
+
+@functools.lru_cache(maxsize=512)
+def _clean_query(query: str) -> str:
+    """
+    Normalize a raw tool query into the canonical Brave search string.
+    
+    Strips opinion phrases, case-folds, and rewrites weather questions to ask for current
+    conditions. Returns an empty string when nothing worth searching for is left.
+    """
+    # Remove opinion phrases and focus on factual content
+    cleaned_query = _OPINION_RE.sub("", query).strip().casefold()
+    
+    # Skip empty, filler, run-on, or pure-opinion queries entirely
+    query_tokens = cleaned_query.split()
+    if len(query_tokens) < 2 or len(query_tokens) > _MAX_QUERY_TOKENS or cleaned_query in _FILLER:
+        return ""
+    if _OPINION_MARKER_RE.match(cleaned_query):
+        return ""
+    cleaned_query = " ".join(query_tokens)
+    
+    # Enhance weather queries to get current conditions
+    if "weather" in cleaned_query:
+        if _NYC_RE.search(cleaned_query):
+            return "current weather temperature new york city today"
+        if _TEMPERATURE_TERMS_RE.search(cleaned_query):
+            # Already has temperature terms
+            return f"current {cleaned_query} today"
+        return f"current weather {cleaned_query} today"
     
-    return f"As {current_persona}, I offer this guidance: {guidance}"
+    return cleaned_query
 
 @function_tool()
 async def brave_search(ctx: RunContext, query: str) -> str:
@@ -157,28 +397,35 @@ async def brave_search(ctx: RunContext, query: str) -> str:
         logger.warning("⚠️ BRAVE_API_KEY not configured - search unavailable")
         return "Search is currently unavailable. Please verify information independently."
     
-    # Clean up the query by removing opinion phrases and focusing on factual content
-    cleaned_query = query.replace("I think", "").replace("I believe", "").replace("In my opinion", "").strip()
+    # Clean up the query (cached - identical questions recur throughout a debate)
+    search_query = _clean_query(query)
+    if not search_query:
+        logger.info("🔍 Skipping Brave Search for non-factual query: %s", query)
+        return "No factual claim to verify."
     
-    # Enhance weather queries to get current conditions
-    if "weather" in cleaned_query.lower():
-        if "new york" in cleaned_query.lower() or "nyc" in cleaned_query.lower():
-            cleaned_query = "current weather temperature New York City today"
-        elif any(word in cleaned_query.lower() for word in ["temperature", "temp", "degrees"]):
-            # Already has temperature terms
-            cleaned_query = f"current {cleaned_query} today"
-        else:
-            cleaned_query = f"current weather {cleaned_query} today"
+    # Serve repeated fact-checks from the TTL cache
+    cached = _SEARCH_CACHE.get(search_query) or _NO_RESULTS_CACHE.get(search_query)
+    if cached is not None:
+        logger.info("🔍 Brave Search cache hit for: %s", search_query)
+        return cached
     
-    search_query = cleaned_query if cleaned_query else query
+    # Coalesce concurrent identical fact-checks onto a single in-flight Brave request. The fetch runs
+    # as its own task so an interrupted caller doesn't abort it: the result still lands in the cache
+    # (and its fact-check memory write is queued) for the next time the claim comes up.
+    task = _INFLIGHT.get(search_query)
+    if task is None:
+        task = asyncio.create_task(_search_brave(search_query))
+        # _INFLIGHT holds the strong reference that keeps the task alive until it finishes
+        _INFLIGHT[search_query] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(search_query, None))
+    else:
+        logger.info("🔍 Joining in-flight Brave Search for: %s", search_query)
     
-    # Headers following Brave Search API best practices from Context7 documentation
-    headers = {
-        "Accept": "application/json",
-        "Accept-Encoding": "gzip",
-        "X-Subscription-Token": BRAVE_API_KEY,
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    }
+    # shield() so one cancelled caller doesn't cancel the shared request for everyone else
+    return await asyncio.shield(task)
+
+async def _search_brave(search_query: str) -> str:
+    """Run a single Brave Search request and format the top results for voice"""
     params = {
         "q": search_query,
         "count": 3,  # Get top 3 results for concise fact-checking
@@ -188,79 +435,49 @@ async def brave_search(ctx: RunContext, query: str) -> str:
     }
 
     try:
-        logger.info(f"🔍 Brave Search query: {search_query}")
+        logger.info("🔍 Brave Search query: %s", search_query)
+        
+        # Hard deadline for the whole request so a slow body can't stall the voice loop
+        async with asyncio.timeout(BRAVE_DEADLINE_SECONDS):
+            response = await _get_brave_client().get(BRAVE_SEARCH_PATH, params=params)
+        response.raise_for_status()
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(BRAVE_API_URL, headers=headers, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            web_results = data.get("web", {}).get("results", [])
-
-            # DEBUG: Log raw results to understand what we're getting
-            logger.info(f"🔍 DEBUG: Brave Search returned {len(web_results)} results")
-            for i, result in enumerate(web_results[:3]):
-                title = result.get("title", "No title")
-                url = result.get("url", "")
-                description = result.get("description", "")
-                logger.info(f"🔍 DEBUG Result {i+1}: {title}")
-                logger.info(f"🔍 DEBUG URL {i+1}: {url}")
-                logger.info(f"🔍 DEBUG Description {i+1}: {description[:100]}...")
-
-            if not web_results:
-                return f"No sources found for: {search_query}"
-
-            # Format results for concise presentation, including descriptions for weather
-            formatted_results = []
-            for result in web_results:
-                title = result.get("title", "No title")
-                url = result.get("url", "")
-                description = result.get("description", "")
-                
-                # For weather queries, include temperature from description if available
-                temp_info = ""
-                if "weather" in search_query.lower() and description:
-                    # Extract temperature info from description
-                    if "°" in description or "degrees" in description.lower():
-                        # Find temperature mentions
-                        import re
-                        temp_matches = re.findall(r'\b\d+\s*°?[FfCc]?\b', description)
-                        if temp_matches:
-                            temp_info = f" - {temp_matches[0]}"
-                
-                # Truncate title if too long for voice
-                if len(title) > 60:
-                    title = title[:57] + "..."
-                
-                result_line = f"• {title}"
-                if temp_info:
-                    result_line += temp_info
-                    
-                formatted_results.append(result_line)
-            
-            result_text = "\n".join(formatted_results)
-            
-            # Store fact-check in memory if available
-            if memory_manager:
-                try:
-                    await memory_manager.store_fact_check(
-                        statement=search_query,
-                        status=f"Verified with sources: {result_text}"
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to store fact-check in memory: {e}")
-            
-            logger.info(f"✅ Brave Search returned {len(web_results)} results")
-            return f"Based on current sources:\n{result_text}"
-
-    except httpx.TimeoutException:
+        # orjson decodes the decompressed bytes directly - faster than response.json()
+        # and bytes-to-dict happens in one pass without an intermediate str copy of the body
+        data = orjson.loads(response.content)
+        web_results = data.get("web", {}).get("results", [])[:3]
+
+        logger.info("🔍 DEBUG: Brave Search returned %s results", len(web_results))
+        if not web_results:
+            no_results = f"No sources found for: {search_query}"
+            _NO_RESULTS_CACHE[search_query] = no_results
+            return no_results
+
+        # Format results for concise presentation in a single pass, including temperatures for weather
+        is_weather = "weather" in search_query
+        # (a list comprehension beats a generator here - str.join materializes its input anyway)
+        result_text = "\n".join([_format_result(result, is_weather) for result in web_results])
+        
+        # Store fact-check in memory if available (queued - never blocks the reply)
+        _queue_memory_write({
+            "type": "fact_check",
+            "statement": search_query,
+            "status": f"Verified with sources: {result_text}",
+        })
+        
+        logger.info("✅ Brave Search returned %s results", len(web_results))
+        result = f"Based on current sources:\n{result_text}"
+        _SEARCH_CACHE[search_query] = result
+        return result
+
+    except (httpx.TimeoutException, TimeoutError):
         logger.error("⏰ Brave Search request timed out")
         return "Search timed out. Please verify information independently."
     except httpx.HTTPStatusError as e:
-        logger.error(f"❌ Brave Search HTTP error: {e.response.status_code}")
+        logger.error("❌ Brave Search HTTP error: %s", e.response.status_code)
         return "Search service temporarily unavailable."
     except Exception as e:
-        logger.error(f"❌ Brave Search error: {e}")
+        logger.error("❌ Brave Search error: %s", e)
         return f"Search failed: {str(e)}"
 
 @function_tool()
@@ -271,109 +488,104 @@ async def set_debate_topic(ctx: RunContext, topic: str) -> str:
     Args:
         topic: The new topic for discussion
     """
-    global current_topic
-    current_topic = topic
-    logger.info(f"📝 Topic set to: {topic}")
+    # Per-session state lives on the agent, so concurrent rooms on one worker never share it
+    agent = ctx.session.current_agent
+    agent.topic = topic
+    logger.info("📝 Topic set to: %s", topic)
     
-    # Store topic change in memory if available
-    if memory_manager:
-        try:
-            await memory_manager.store_topic_change(
-                topic=topic,
-                persona=current_persona
-            )
-        except Exception as e:
-            logger.warning(f"Failed to store topic change in memory: {e}")
+    # Store topic change in memory if available (queued - never blocks the reply)
+    _queue_memory_write({
+        "type": "topic_change",
+        "topic": topic,
+        "persona": agent.persona,
+    })
     
     return f"Debate topic changed to: {topic}"
 
+# Function tools shared by every moderator agent
+_TOOLS = (moderate_discussion, brave_search, set_debate_topic)
+
+def _parse_metadata(raw) -> dict:
+    """Decode job metadata delivered either as a JSON string or an already-parsed dict"""
+    if not raw:
+        return {}
+    if isinstance(raw, dict):
+        return raw
+    try:
+        metadata = orjson.loads(raw)
+    except (orjson.JSONDecodeError, TypeError) as e:
+        logger.warning("Failed to parse job metadata: %s", e)
+        return {}
+    if not isinstance(metadata, dict):
+        logger.warning("Ignoring non-object job metadata: %s", type(metadata).__name__)
+        return {}
+    return metadata
+
 # Main entrypoint following exact official pattern
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for the Sage AI Debate Moderator Agent"""
     try:
         # Connect to the room
         await ctx.connect()
-        logger.info(f"🔗 Connected to LiveKit room: {ctx.room.name}")
-        
-        # Get metadata from job context
-        job_metadata = {}
-        if hasattr(ctx.job, 'metadata') and ctx.job.metadata:
-            try:
-                if isinstance(ctx.job.metadata, str):
-                    job_metadata = json.loads(ctx.job.metadata)
-                else:
-                    job_metadata = ctx.job.metadata
-            except (json.JSONDecodeError, TypeError) as e:
-                logger.warning(f"Failed to parse job metadata: {e}")
+        # Release pooled Brave connections and flush queued memory writes when the job ends
+        ctx.add_shutdown_callback(_close_brave_client)
+        if not _memory_loaded:
+            # Normally done by prewarm; otherwise connect off the event loop
+            await asyncio.to_thread(_load_memory_manager)
+        _start_memory_writer()
+        ctx.add_shutdown_callback(_drain_memory_writer)
+        logger.info("🔗 Connected to LiveKit room: %s", ctx.room.name)
         
-        # Get persona and topic from metadata
-        current_persona = job_metadata.get('persona', 'Socrates')
-        current_topic = job_metadata.get('topic', 'philosophical discourse')
+        # Get persona and topic from job metadata
+        job_metadata = _parse_metadata(getattr(ctx.job, 'metadata', None))
+        current_persona, current_topic = _normalize_persona(job_metadata.get('persona')), job_metadata.get('topic', 'philosophical discourse')
         
-        logger.info(f"🎭 Initializing agent as: {current_persona}")
-        logger.info(f"📝 Debate topic: {current_topic}")
-        logger.info(f"🏠 Room: {ctx.room.name} (participants: {len(ctx.room.remote_participants)})")
-        
-        # Get the global memory manager (if available)
-        global memory_manager
+        logger.info("🎭 Initializing agent as: %s", current_persona)
+        logger.info("📝 Debate topic: %s", current_topic)
+        logger.info("🏠 Room: %s (participants: %s)", ctx.room.name, len(ctx.room.remote_participants))
         
         # Configure the debate moderator agent
         agent = DebateModerator(persona=current_persona, topic=current_topic)
         
-        # Debug: Check if Cartesia API key is available
-        cartesia_key = os.environ.get('CARTESIA_API_KEY')
-        logger.info(f"🔑 CARTESIA_API_KEY: {'✅ Available' if cartesia_key else '❌ Missing'}")
-        
-        tts = cartesia.TTS(
-            model="sonic-2-2025-03-07",  # Updated model that supports speed controls
-            voice="a0e99841-438c-4a64-b679-ae501e7d6091",  # British Male (professional, deeper voice)
-            speed=0.8, # Added speed parameter
-        )
+        # Reuse the worker-wide plugin instances instead of rebuilding them per room
+        vad, stt, llm, tts = await _get_plugins(ctx.proc)
         
         # Create the agent session with proper configuration
         session = AgentSession(
-            vad=silero.VAD.load(),
-            stt=deepgram.STT(model="nova-3"),
-            llm=openai.LLM(model="gpt-4o-mini"),
+            vad=vad,
+            stt=stt,
+            llm=llm,
             tts=tts,
+            # Start the LLM on the final transcript while end-of-turn is still being confirmed
+            preemptive_generation=True,
         )
         
         # Start the persistent session
         await session.start(agent=agent, room=ctx.room)
         
         logger.info("🎉 Sage AI Debate Moderator Agent is now active and listening!")
-        logger.info(f"🏠 Agent joined room: {ctx.room.name}")
-        logger.info(f"👤 Agent participant identity: {current_persona}")
+        logger.info("🏠 Agent joined room: %s", ctx.room.name)
+        logger.info("👤 Agent participant identity: %s", current_persona)
         
-        # Send initial greeting using official LiveKit pattern
-        greeting_instruction = f"Give exactly this greeting: 'Hello, I'm {current_persona}. Today we'll be discussing {current_topic}. Go ahead with your opening arguments, and call upon me as needed.'"
-        logger.info(f"🎤 Generating initial greeting for {current_persona}")
-        await session.generate_reply(instructions=greeting_instruction)
+        # Speak the fixed greeting directly - no LLM round-trip needed to repeat exact words
+        greeting = _GREETING_TEMPLATE.format(persona=current_persona, topic=current_topic)
+        logger.info("🎤 Speaking initial greeting for %s", current_persona)
+        await session.say(greeting, allow_interruptions=True)
         
     except Exception as e:
-        logger.error(f"❌ Error in entrypoint: {e}")
+        logger.error("❌ Error in entrypoint: %s", e)
         raise
 
 # Request handler - use persona name as identity (what frontend expects)
 async def handle_job_request(job_req: JobRequest):
     """Handle incoming job requests with persona-based identity"""
     try:
-        # Extract persona from job metadata
-        job_metadata = {}
-        if hasattr(job_req.job, 'metadata') and job_req.job.metadata:
-            try:
-                if isinstance(job_req.job.metadata, str):
-                    job_metadata = json.loads(job_req.job.metadata)
-                else:
-                    job_metadata = job_req.job.metadata
-            except (json.JSONDecodeError, TypeError) as e:
-                logger.warning(f"Failed to parse job metadata: {e}")
-        
-        # Get persona from metadata, default to Socrates
-        persona = job_metadata.get('persona', 'Socrates')
+        # Get persona from job metadata, default to Socrates for missing or unknown personas
+        job_metadata = _parse_metadata(getattr(job_req.job, 'metadata', None))
+        persona = _normalize_persona(job_metadata.get('persona'))
         
-        logger.info(f"🎭 Job request received for room: {job_req.room.name}")
-        logger.info(f"🎭 Setting agent identity to: {persona}")
+        logger.info("🎭 Job request received for room: %s", job_req.room.name)
+        logger.info("🎭 Setting agent identity to: %s", persona)
         
         # ✅ FIXED: Use persona name as identity (LiveKit best practice)
         # Frontend expects agent identity to match persona name exactly
@@ -382,25 +594,25 @@ async def handle_job_request(job_req: JobRequest):
             name=f"Sage AI - {persona}",         # Display name with persona
         )
         
-        logger.info(f"✅ Agent accepted job with identity: {persona}")
+        logger.info("✅ Agent accepted job with identity: %s", persona)
         
     except Exception as e:
-        logger.error(f"❌ Error handling job request: {e}")
+        logger.error("❌ Error handling job request: %s", e)
         await job_req.reject()
 
+# Environment variables the worker needs - reported once at startup
+_REQUIRED_ENV = ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET", "OPENAI_API_KEY", "DEEPGRAM_API_KEY", "CARTESIA_API_KEY", "BRAVE_API_KEY")
+
 # CLI integration with agent registration for dispatch system
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     logger.info("🚀 Starting Sage AI Debate Moderator Agent...")
-    logger.info(f"🔑 Environment check:")
-    logger.info(f"   LIVEKIT_URL: {'✅ Set' if os.getenv('LIVEKIT_URL') else '❌ Missing'}")
-    logger.info(f"   LIVEKIT_API_KEY: {'✅ Set' if os.getenv('LIVEKIT_API_KEY') else '❌ Missing'}")
-    logger.info(f"   LIVEKIT_API_SECRET: {'✅ Set' if os.getenv('LIVEKIT_API_SECRET') else '❌ Missing'}")
-    logger.info(f"   OPENAI_API_KEY: {'✅ Set' if os.getenv('OPENAI_API_KEY') else '❌ Missing'}")
-    logger.info(f"   DEEPGRAM_API_KEY: {'✅ Set' if os.getenv('DEEPGRAM_API_KEY') else '❌ Missing'}")
-    logger.info(f"   BRAVE_API_KEY: {'✅ Set' if os.getenv('BRAVE_API_KEY') else '❌ Missing'}")
+    env_status = {name: "✅" if os.environ.get(name) else "❌" for name in _REQUIRED_ENV}
+    logger.info("🔑 Environment check: %s", env_status)
     
     cli.run_app(WorkerOptions(
         entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,  # Load the VAD model before jobs arrive
         request_fnc=handle_job_request,  # Custom job request handler
         agent_name="sage-debate-moderator",  # Register with specific name for dispatch
         # Configure worker permissions according to official LiveKit API
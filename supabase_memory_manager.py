@@ -11,7 +11,8 @@ import json
 import logging
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime, timezone
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -39,10 +40,10 @@ class SupabaseMemoryManager:
         """Initialize Supabase connection with proper error handling"""
         try:
             # Debug: Show what environment variables we're finding
-            logger.info(f"🔍 Checking environment variables:")
-            logger.info(f"   SUPABASE_URL: {'✅ Found' if self.url else '❌ Not found'}")
-            logger.info(f"   SUPABASE_SERVICE_ROLE_KEY: {'✅ Found' if self.service_role_key else '❌ Not found'}")
-            logger.info(f"   SUPABASE_ANON_KEY: {'✅ Found' if self.anon_key else '❌ Not found'}")
+            logger.info("🔍 Checking environment variables:")
+            logger.info("   SUPABASE_URL: %s", '✅ Found' if self.url else '❌ Not found')
+            logger.info("   SUPABASE_SERVICE_ROLE_KEY: %s", '✅ Found' if self.service_role_key else '❌ Not found')
+            logger.info("   SUPABASE_ANON_KEY: %s", '✅ Found' if self.anon_key else '❌ Not found')
             
             if not self.url:
                 logger.warning("SUPABASE_URL not found in environment variables")
@@ -55,10 +56,21 @@ class SupabaseMemoryManager:
                 logger.warning("Supabase credentials not found. Required: SUPABASE_URL and either SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY")
                 return
             
-            logger.info(f"🔗 Connecting to Supabase at: {self.url}")
-            
-            # Create Supabase client
-            self.client = create_client(self.url, api_key)
+            logger.info("🔗 Connecting to Supabase at: %s", self.url)
+            
+            # Create Supabase client on a pooled keep-alive HTTP client so store_* calls reuse connections
+            # (httpx_client needs supabase>=2.16). postgrest sets its own base_url and headers on this client,
+            # so it must not be shared with anything other than this Supabase client
+            options = ClientOptions(
+                postgrest_client_timeout=10,
+                storage_client_timeout=10,
+                httpx_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=30),
+                    http2=True,
+                    timeout=10,
+                ),
+            )
+            self.client = create_client(self.url, api_key, options=options)
             
             # Test connection by querying the auth service
             try:
@@ -68,12 +80,12 @@ class SupabaseMemoryManager:
                 logger.info("✅ Supabase connection established successfully")
                 
             except Exception as test_error:
-                logger.error(f"❌ Supabase connection test failed: {test_error}")
+                logger.error("❌ Supabase connection test failed: %s", test_error)
                 logger.error("💡 Check that tables exist and RLS policies are configured")
                 self.client = None
                 
         except Exception as e:
-            logger.error(f"❌ Failed to initialize Supabase client: {e}")
+            logger.error("❌ Failed to initialize Supabase client: %s", e)
             logger.info("💿 Memory features will be disabled. Agent will continue without persistent memory.")
     
     def is_available(self) -> bool:
@@ -100,14 +112,14 @@ class SupabaseMemoryManager:
             
             if result.data and len(result.data) > 0:
                 session_id = result.data[0]['id']
-                logger.info(f"✅ Session created: {session_id}")
+                logger.info("✅ Session created: %s", session_id)
                 return session_id
             else:
                 logger.error("❌ Session creation failed: no data returned")
                 return None
                 
         except Exception as e:
-            logger.error(f"❌ Failed to create session: {e}")
+            logger.error("❌ Failed to create session: %s", e)
             return None
     
     async def add_conversation_turn(self, session_id: str, speaker: str, content: str, turn_type: str = "speech") -> bool:
@@ -127,14 +139,14 @@ class SupabaseMemoryManager:
             result = self.client.table('conversation_turns').insert(turn_data).execute()
             
             if result.data:
-                logger.debug(f"💾 Conversation turn stored: {speaker} - {turn_type}")
+                logger.debug("💾 Conversation turn stored: %s - %s", speaker, turn_type)
                 return True
             else:
-                logger.warning(f"Failed to store conversation turn: {speaker}")
+                logger.warning("Failed to store conversation turn: %s", speaker)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Failed to add conversation turn: {e}")
+            logger.error("❌ Failed to add conversation turn: %s", e)
             return False
     
     async def add_participant_memory(self, session_id: str, participant: str, memory_type: str, content: str) -> bool:
@@ -154,14 +166,14 @@ class SupabaseMemoryManager:
             result = self.client.table('participant_memory').insert(memory_data).execute()
             
             if result.data:
-                logger.debug(f"💾 Participant memory stored: {participant} - {memory_type}")
+                logger.debug("💾 Participant memory stored: %s - %s", participant, memory_type)
                 return True
             else:
-                logger.warning(f"Failed to store participant memory: {participant}")
+                logger.warning("Failed to store participant memory: %s", participant)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Failed to add participant memory: {e}")
+            logger.error("❌ Failed to add participant memory: %s", e)
             return False
     
     async def add_moderation_action(self, session_id: str, action_type: str, details: Dict[str, Any]) -> bool:
@@ -180,14 +192,14 @@ class SupabaseMemoryManager:
             result = self.client.table('moderation_actions').insert(action_data).execute()
             
             if result.data:
-                logger.debug(f"💾 Moderation action stored: {action_type}")
+                logger.debug("💾 Moderation action stored: %s", action_type)
                 return True
             else:
-                logger.warning(f"Failed to store moderation action: {action_type}")
+                logger.warning("Failed to store moderation action: %s", action_type)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Failed to add moderation action: {e}")
+            logger.error("❌ Failed to add moderation action: %s", e)
             return False
     
     async def get_conversation_history(self, session_id: str, limit: int = 20) -> List[Dict[str, Any]]:
@@ -199,14 +211,14 @@ class SupabaseMemoryManager:
             result = self.client.table('conversation_turns').select('*').eq('session_id', session_id).order('timestamp', desc=False).limit(limit).execute()
             
             if result.data:
-                logger.debug(f"📖 Retrieved {len(result.data)} conversation turns")
+                logger.debug("📖 Retrieved %s conversation turns", len(result.data))
                 return result.data
             else:
                 logger.debug("No conversation history found")
                 return []
                 
         except Exception as e:
-            logger.error(f"❌ Failed to get conversation history: {e}")
+            logger.error("❌ Failed to get conversation history: %s", e)
             return []
     
     async def get_participant_memories(self, session_id: str, participant: str) -> List[Dict[str, Any]]:
@@ -218,14 +230,14 @@ class SupabaseMemoryManager:
             result = self.client.table('participant_memory').select('*').eq('session_id', session_id).eq('participant', participant).order('created_at', desc=False).execute()
             
             if result.data:
-                logger.debug(f"🧠 Retrieved {len(result.data)} memories for {participant}")
+                logger.debug("🧠 Retrieved %s memories for %s", len(result.data), participant)
                 return result.data
             else:
-                logger.debug(f"No memories found for {participant}")
+                logger.debug("No memories found for %s", participant)
                 return []
                 
         except Exception as e:
-            logger.error(f"❌ Failed to get participant memories: {e}")
+            logger.error("❌ Failed to get participant memories: %s", e)
             return []
     
     async def update_session_status(self, session_id: str, status: str) -> bool:
@@ -241,14 +253,14 @@ class SupabaseMemoryManager:
             result = self.client.table('debate_sessions').update(update_data).eq('id', session_id).execute()
             
             if result.data:
-                logger.info(f"📊 Session {session_id} status updated to: {status}")
+                logger.info("📊 Session %s status updated to: %s", session_id, status)
                 return True
             else:
-                logger.warning(f"Failed to update session status: {session_id}")
+                logger.warning("Failed to update session status: %s", session_id)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Failed to update session status: {e}")
+            logger.error("❌ Failed to update session status: %s", e)
             return False
     
     async def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
@@ -260,14 +272,14 @@ class SupabaseMemoryManager:
             result = self.client.table('debate_sessions').select('*').eq('id', session_id).execute()
             
             if result.data and len(result.data) > 0:
-                logger.debug(f"📋 Retrieved session info: {session_id}")
+                logger.debug("📋 Retrieved session info: %s", session_id)
                 return result.data[0]
             else:
-                logger.warning(f"Session not found: {session_id}")
+                logger.warning("Session not found: %s", session_id)
                 return None
                 
         except Exception as e:
-            logger.error(f"❌ Failed to get session info: {e}")
+            logger.error("❌ Failed to get session info: %s", e)
             return None
 
     # Additional convenience methods for agent function tools
@@ -291,11 +303,11 @@ class SupabaseMemoryManager:
             }
             
             # For now, just log the action since we don't have session context
-            logger.info(f"💾 Moderation action: {persona} - {action} - {content}")
+            logger.info("💾 Moderation action: %s - %s - %s", persona, action, content)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Failed to store moderation action: {e}")
+            logger.error("❌ Failed to store moderation action: %s", e)
             return False
 
     async def store_fact_check(self, statement: str, status: str) -> bool:
@@ -305,11 +317,11 @@ class SupabaseMemoryManager:
             
         try:
             # Log the fact-check request
-            logger.info(f"🔍 Fact-check request: {statement} - {status}")
+            logger.info("🔍 Fact-check request: %s - %s", statement, status)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Failed to store fact-check: {e}")
+            logger.error("❌ Failed to store fact-check: %s", e)
             return False
 
     async def store_topic_change(self, topic: str, persona: str) -> bool:
@@ -319,11 +331,37 @@ class SupabaseMemoryManager:
             
         try:
             # Log the topic change
-            logger.info(f"📝 Topic change: {persona} set topic to '{topic}'")
+            logger.info("📝 Topic change: %s set topic to '%s'", persona, topic)
+            return True
+            
+        except Exception as e:
+            logger.error("❌ Failed to store topic change: %s", e)
+            return False
+
+    async def store_batch(self, items: List[Dict[str, Any]]) -> bool:
+        """Store a batch of queued agent tool events (moderation, fact_check, topic_change)"""
+        if not self.is_available():
+            return False
+            
+        try:
+            # Like the single-event store_* methods above, these events have no session context yet,
+            # so the batch is logged in one pass; once session tracking lands this becomes one multi-row insert
+            for item in items:
+                event_type = item.get('type')
+                if event_type == 'moderation':
+                    logger.info("💾 Moderation action: %s - %s - %s", item.get('persona'), item.get('action'), item.get('content'))
+                elif event_type == 'fact_check':
+                    logger.info("🔍 Fact-check request: %s - %s", item.get('statement'), item.get('status'))
+                elif event_type == 'topic_change':
+                    logger.info("📝 Topic change: %s set topic to '%s'", item.get('persona'), item.get('topic'))
+                else:
+                    logger.warning("Unknown memory event type: %s", event_type)
+            
+            logger.debug("💾 Stored batch of %s memory events", len(items))
             return True
             
         except Exception as e:
-            logger.error(f"❌ Failed to store topic change: {e}")
+            logger.error("❌ Failed to store memory batch: %s", e)
             return False
 
 # Global instance